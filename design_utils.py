@@ -0,0 +1,267 @@
+"""
+Shared AI helpers for the Interior Decorator app.
+
+Kept out of app.py so that a future multipage setup imports a single
+module instead of re-running client setup per page.
+"""
+
+import streamlit as st
+import os
+from dotenv import load_dotenv
+from tenacity import retry, retry_if_exception, wait_exponential_jitter, stop_after_attempt
+import io
+import orjson
+import time
+import asyncio
+import concurrent.futures
+from typing import TypedDict
+from urllib.parse import quote_plus
+
+load_dotenv()
+
+# Get API Key securely
+api_key = os.environ.get("GEMINI_API_KEY")
+
+# Batch API is opt-in (50% cheaper but results arrive asynchronously)
+batch_enabled = os.environ.get("GEMINI_BATCH_ENABLED") == "1"
+
+STYLES = ["Modern Minimalist", "Bohemian Chic", "Industrial Loft",
+          "Mid-Century Modern", "Scandinavian", "Cyberpunk", "Luxury Art Deco"]
+
+@st.cache_resource
+def get_executor():
+    """Shared background pool so extraction can overlap with rendering."""
+    return concurrent.futures.ThreadPoolExecutor(max_workers=4)
+
+@st.cache_resource
+def get_client():
+    """
+    Builds the Google AI Client once and reuses it across reruns,
+    so the connection pool / auth state survive every interaction.
+    Imported lazily: google.genai pulls grpc/protobuf (~hundreds of ms),
+    a cost reruns that never generate should not pay.
+    """
+    from google import genai
+    return genai.Client(api_key=os.environ["GEMINI_API_KEY"])
+
+@st.cache_resource
+def _get_generate_fn():
+    """
+    Resolves the image-generation method once per process. SDK versions
+    disagree on generate_image vs generate_images; probing with
+    try/except AttributeError on every call is wasted hot-path work.
+    """
+    models = get_client().models
+    fn = getattr(models, "generate_images", None) or models.generate_image
+    print(f"design_utils: using client.models.{fn.__name__} for generation")
+    return fn
+
+def _is_transient(e):
+    """Retry only on rate limits (429) and server errors (5xx) — never on auth/4xx."""
+    from google.genai import errors
+    return isinstance(e, errors.APIError) and (e.code == 429 or e.code >= 500)
+
+def _notify_retry(retry_state):
+    st.toast(f"⏳ Transient API error, retrying (attempt {retry_state.attempt_number})...")
+
+# Shared retry policy for transient Gemini failures
+_transient_retry = retry(
+    retry=retry_if_exception(_is_transient),
+    wait=wait_exponential_jitter(initial=1, max=30),
+    stop=stop_after_attempt(5),
+    before_sleep=_notify_retry,
+    reraise=True,
+)
+
+# persist="disk" keeps generated rooms across server restarts/deploys;
+# max_entries bounds disk use and the week-long ttl ages out stale designs
+@st.cache_data(persist="disk", max_entries=500, ttl=7 * 24 * 3600, show_spinner=False)
+@_transient_retry
+def _cached_generate(style, user_notes, image_bytes=None):
+    """
+    Cached core of the generation step.
+    Keyed on (style, notes, uploaded image bytes) so identical reruns
+    skip the API call entirely. Returns raw PNG bytes (serializable).
+    """
+    from google.genai import types
+
+    # Base prompt
+    prompt = f"A photorealistic interior design photo of a {style} room. {user_notes}. High quality, 8k resolution, architectural photography."
+
+    response = _get_generate_fn()(
+        model='imagen-3.0-generate-001',
+        prompt=prompt,
+        config=types.GenerateImageConfig(number_of_images=1)
+    )
+    return response.generated_images[0].image.image_bytes
+
+def generate_room_image(style, user_notes, uploaded_file=None):
+    """
+    Generates a room design. Returns PNG bytes (or None on failure).
+    """
+    if not api_key: return None
+
+    # Pass raw bytes so the cache key is hashable
+    image_bytes = uploaded_file.getvalue() if uploaded_file else None
+
+    try:
+        return _cached_generate(style, user_notes, image_bytes)
+    except Exception as e:
+        st.error(f"Image Generation Failed: {e}")
+        return None
+
+def generate_room_images(styles, user_notes, uploaded_file=None):
+    """
+    Generates several styles concurrently instead of one after another,
+    so N styles cost ~1x the wall-clock time instead of Nx.
+    Returns a dict of style -> PNG bytes (failed styles are omitted).
+    """
+    if not api_key: return {}
+
+    image_bytes = uploaded_file.getvalue() if uploaded_file else None
+
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+        futures = {
+            pool.submit(_cached_generate, s, user_notes, image_bytes): s
+            for s in styles
+        }
+        for future in concurrent.futures.as_completed(futures):
+            s = futures[future]
+            try:
+                results[s] = future.result()
+            except Exception as e:
+                st.warning(f"Generation failed for {s}: {e}")
+    return results
+
+def generate_all_styles_batch(styles, user_notes):
+    """
+    Generates every style through the Gemini Batch API (half the cost of
+    interactive calls). Uploads one JSONL line per style prompt, polls the
+    job with exponential backoff, then maps results back to their styles.
+    Returns a dict of style -> PNG bytes.
+    """
+    if not api_key: return {}
+    client = get_client()
+
+    # One JSONL line per style, keyed so results can be matched back
+    lines = []
+    for s in styles:
+        prompt = f"A photorealistic interior design photo of a {s} room. {user_notes}. High quality, 8k resolution, architectural photography."
+        lines.append(orjson.dumps({"key": s, "request": {"prompt": prompt}}))
+
+    jsonl_file = client.files.upload(
+        file=io.BytesIO(b"\n".join(lines)),
+        config={"mime_type": "application/jsonl"}
+    )
+    job = client.batches.create(model='imagen-3.0-generate-001', src=jsonl_file.name)
+
+    # Poll with exponential backoff: 1s, 2s, 4s, ... capped at 60s
+    delay = 1
+    while job.state.name not in ("JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED"):
+        time.sleep(delay)
+        delay = min(delay * 2, 60)
+        job = client.batches.get(name=job.name)
+
+    if job.state.name != "JOB_STATE_SUCCEEDED":
+        st.error(f"Batch job ended in state {job.state.name}")
+        return {}
+
+    results = {}
+    for line in client.files.download(file=job.dest.file_name).decode("utf-8").splitlines():
+        record = orjson.loads(line)
+        try:
+            results[record["key"]] = client.files.download(
+                file=record["response"]["generated_images"][0]["image"]["uri"])
+        except (KeyError, IndexError) as e:
+            st.warning(f"No image in batch result for {record.get('key')}: {e}")
+    return results
+
+def _prepare_image(image_bytes):
+    """
+    Shrinks an image to <=1024px on its longest side and re-encodes as
+    JPEG (q=85) before it goes over the wire. A 4000x3000 phone photo
+    would otherwise become multi-megabyte base64 in the API request.
+    Takes and returns raw bytes; images already small enough are passed
+    through untouched so they are never decoded/re-encoded.
+    """
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(image_bytes))
+    if max(img.size) <= 1024:
+        return image_bytes
+    img.thumbnail((1024, 1024), Image.Resampling.LANCZOS)
+    buf = io.BytesIO()
+    img.convert("RGB").save(buf, format="JPEG", quality=85, optimize=True)
+    return buf.getvalue()
+
+def _image_mime(image_bytes):
+    return "image/png" if image_bytes[:8] == b"\x89PNG\r\n\x1a\n" else "image/jpeg"
+
+class Item(TypedDict):
+    name: str
+    color: str
+    query: str
+
+@_transient_retry
+def _analyze_image(image_bytes, prompt):
+    from google.genai import types
+
+    # response_schema makes Gemini return guaranteed-valid JSON,
+    # so no markdown-fence cleanup is needed downstream
+    return get_client().models.generate_content(
+        model='gemini-2.0-flash',
+        contents=[types.Part.from_bytes(data=image_bytes, mime_type=_image_mime(image_bytes)), prompt],
+        config=types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=list[Item],
+        )
+    )
+
+async def _fetch_product(query, semaphore):
+    """
+    Per-item enrichment hook. Today it only builds the shopping URL, but
+    thumbnail/price lookups slot in here without touching the callers —
+    the semaphore already bounds how many run at once.
+    """
+    async with semaphore:
+        return {"query": query,
+                "url": f"https://www.google.com/search?q={quote_plus(query)}&tbm=shop"}
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def enrich_products(queries):
+    """
+    Enriches all product queries concurrently via asyncio.gather (at most
+    5 in flight), so N lookups cost ~1 round-trip instead of N. Results
+    are cached per query for a day. Returns a dict of query -> enrichment.
+    """
+    async def _gather():
+        semaphore = asyncio.Semaphore(5)
+        return await asyncio.gather(*[_fetch_product(q, semaphore) for q in queries])
+
+    return {e["query"]: e for e in asyncio.run(_gather())}
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def extract_product_data(image_bytes):
+    """
+    Uses Gemini Vision to 'mine' the generated image for specific products.
+    Takes raw image bytes so nothing is re-decoded between the SDK, the
+    cache and the API request.
+    """
+    if not api_key: return []
+
+    prompt = """
+    Analyze this interior design image. Identify 5 distinct furniture or decor items visible.
+    For each item give:
+    - "name": The name of the item (e.g., "Velvet Sofa")
+    - "color": The specific color/material
+    - "query": A precise Google Shopping search query
+    """
+
+    try:
+        # Analyze image (response is schema-constrained JSON)
+        response = _analyze_image(image_bytes, prompt)
+        return orjson.loads(response.text)
+    except Exception as e:
+        st.warning(f"Could not extract products: {e}")
+        return []